@@ -1,14 +1,25 @@
 import os
-import tempfile
+import re
+import hashlib
+import sqlite3
 import asyncio
-import requests
+import collections
+import queue
+import threading
+import functools
+import httpx
 import sounddevice as sd
-import soundfile as sf
-import matplotlib.pyplot as plt
 import numpy as np
-import pygame
-from deepgram import DeepgramClient, PrerecordedOptions, SpeakOptions
+from deepgram import (
+    DeepgramClient,
+    DeepgramClientOptions,
+    PrerecordedOptions,
+    SpeakOptions,
+    LiveOptions,
+    LiveTranscriptionEvents,
+)
 from google import genai
+from google.genai import types
 from dotenv import load_dotenv
 from datetime import datetime
 import time
@@ -25,11 +36,26 @@ if not GEMINI_API_KEY or not DEEPGRAM_API_KEY:
     print("Error: API keys not set. Please check your .env file.")
     exit(1)
 
-client = genai.Client(api_key=GEMINI_API_KEY)
-deepgram = DeepgramClient(api_key=DEEPGRAM_API_KEY)
+GEMINI_MODEL = "gemini-2.5-flash"
 
-# Initialize pygame mixer
-pygame.mixer.init()
+# One event loop for the whole session, running on its own thread, so async
+# clients keep their connections and any thread can submit work to it
+loop = asyncio.new_event_loop()
+threading.Thread(target=loop.run_forever, daemon=True).start()
+
+# Shared keep-alive pool so every Gemini call reuses the same TLS connection
+async_http_client = httpx.AsyncClient(
+    timeout=30,
+    limits=httpx.Limits(max_keepalive_connections=4, keepalive_expiry=60)
+)
+client = genai.Client(
+    api_key=GEMINI_API_KEY,
+    http_options=types.HttpOptions(httpx_async_client=async_http_client)
+)
+deepgram = DeepgramClient(
+    DEEPGRAM_API_KEY,
+    DeepgramClientOptions(options={"keepalive": "true"})
+)
 
 # ---------------------------
 # Audio Recording Settings
@@ -37,205 +63,631 @@ pygame.mixer.init()
 SAMPLE_RATE = 16000
 CHANNELS = 1
 DURATION = 20  # seconds per recording
+FRAME_SIZE = SAMPLE_RATE // 50  # 20 ms of PCM16 per streamed frame
+# Barge-in listens while the bot speaks and nothing cancels the speaker echo, so it is
+# only safe with headphones; on open speakers the bot would interrupt itself
+BARGE_IN = os.getenv("AGRI_BARGE_IN") == "1"
+BARGE_IN_RMS = float(os.getenv("AGRI_BARGE_IN_RMS", "0.05"))  # mic level that interrupts the bot
+BARGE_IN_BLOCKS = 10  # consecutive 20 ms frames (~200 ms) above BARGE_IN_RMS needed to interrupt
+TTS_SAMPLE_RATE = 24000  # Deepgram Aura linear16 output rate
+TTS_ENCODING = "linear16"  # format of synthesized and cached audio
+DEBUG_VISUALIZE = os.getenv("AGRI_DEBUG") == "1"  # plot each recording's waveform
+
+# ---------------------------
+# Response Settings
+# ---------------------------
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+SYSTEM_PROMPT = (
+    "You are an expert in Kerala's agriculture helping farmers through a voice chatbot. "
+    "Please keep the response concise and under 2000 characters."
+)
+TTS_CHAR_LIMIT = 2000  # Deepgram's character limit
+TTS_CONCURRENCY = 3  # sentences synthesized at once ahead of playback
+SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?])\s+')
+
+# ---------------------------
+# Semantic Cache Settings
+# ---------------------------
+CACHE_DB = os.path.join(BASE_DIR, "response_cache.db")  # local cache, not tracked in git
+EMBEDDING_MODEL = "gemini-embedding-001"
+EMBEDDING_DIM = 768
+# Minimum cosine similarity for a cache hit. gemini-embedding-001 scores related but different
+# questions ("fertilizer for banana" vs "for coconut") high, so only near-paraphrases pass
+CACHE_SIMILARITY = float(os.getenv("AGRI_CACHE_SIMILARITY", "0.96"))
+CACHE_MAX_ROWS = 1000  # most recent entries kept in memory for lookup
+CACHE_TTL = float(os.getenv("AGRI_CACHE_TTL", "21600"))  # seconds a cached answer stays valid
+
+cache_conn = None
+cache_hashes = []
+cache_embeddings = np.empty((0, EMBEDDING_DIM), dtype=np.float32)
+cache_times = np.empty(0)  # store time (epoch seconds) of each in-memory entry, oldest first
 
 # ---------------------------
 # Helper Functions
 # ---------------------------
-def play_audio(file_path):
-    """Play audio file using pygame."""
+async def play_audio(pcm_bytes):
+    """Play 16-bit mono PCM at TTS_SAMPLE_RATE, stopping immediately if cancelled."""
     try:
-        pygame.mixer.music.load(file_path)
-        pygame.mixer.music.play()
-        while pygame.mixer.music.get_busy():  # Wait for playback to finish
-            pygame.time.Clock().tick(10)
+        sd.play(np.frombuffer(pcm_bytes, dtype=np.int16), TTS_SAMPLE_RATE)
+        await asyncio.to_thread(sd.wait)
+    except asyncio.CancelledError:
+        sd.stop()
+        raise
     except Exception as e:
-        print(f"Error playing audio with pygame: {e}")
-    finally:
-        pygame.mixer.music.unload()
+        print(f"Error playing audio: {e}")
+
+# Reused across recordings so each turn doesn't allocate ~1.3 MB buffers; created on
+# first use so text-only and streaming-only sessions never pay for them
+@functools.lru_cache(maxsize=1)
+def get_recording_buffer():
+    return np.empty((DURATION * SAMPLE_RATE, CHANNELS), dtype=np.float32)
 
 def record_audio(duration=DURATION):
-    """Record audio from microphone and visualize waveform."""
+    """Record audio from microphone, visualizing the waveform when AGRI_DEBUG=1.
+
+    The returned array is a view of the shared recording buffer and is overwritten
+    by the next recording.
+    """
     print(f"🎤 Recording for {duration} seconds...")
-    audio = sd.rec(int(duration * SAMPLE_RATE), samplerate=SAMPLE_RATE, channels=CHANNELS)
-    sd.wait()
-    
-    # Create temporary file
-    tmp_file = tempfile.NamedTemporaryFile(delete=False, suffix=".wav")
-    sf.write(tmp_file.name, audio, SAMPLE_RATE, format='WAV', subtype='PCM_16')
-    tmp_file.close()
-    
-    # Verify file exists
-    if not os.path.exists(tmp_file.name):
-        print(f"Error: Audio file {tmp_file.name} was not created.")
-        return None
+    total_frames = int(duration * SAMPLE_RATE)
+    rec_buf = get_recording_buffer()
+    if total_frames <= len(rec_buf):
+        buffer = rec_buf
+    else:
+        buffer = np.empty((total_frames, CHANNELS), dtype=np.float32)
+    max_amplitude = 0.0
+    filled = 0
+
+    def callback(indata, frames, time_info, status):
+        # Track the peak while each block is still hot instead of rescanning the whole recording
+        nonlocal max_amplitude, filled
+        if status:
+            print(f"Audio input status: {status}")
+        n = min(frames, total_frames - filled)
+        if n <= 0:
+            raise sd.CallbackStop
+        buffer[filled:filled + n] = indata[:n]
+        max_amplitude = max(max_amplitude, float(np.abs(indata[:n]).max()))
+        filled += n
+
+    with sd.InputStream(samplerate=SAMPLE_RATE, channels=CHANNELS, dtype='float32',
+                        blocksize=SAMPLE_RATE // 10, callback=callback):
+        sd.sleep(int(duration * 1000))
+    audio = buffer[:filled]
     
     # Check audio level
-    audio_data, _ = sf.read(tmp_file.name)
-    max_amplitude = np.max(np.abs(audio_data))
     print(f"Audio level: Max amplitude = {max_amplitude:.4f}")
     if max_amplitude < 0.01:
         print("Warning: Audio is too quiet. Speak louder next time.")
     
-    # Play back to confirm audio
-    try:
-        print(f"Playing back recorded audio: {tmp_file.name}")
-        play_audio(os.path.normpath(tmp_file.name))
-    except Exception as e:
-        print(f"Error playing audio: {e}")
+    # Visualize waveform (debug only: plt.pause blocks the turn for 2 seconds)
+    if DEBUG_VISUALIZE:
+        try:
+            import matplotlib.pyplot as plt
+            plt.figure(figsize=(10, 4))
+            time_axis = np.linspace(0, duration, len(audio))
+            plt.plot(time_axis, audio[:, 0] if audio.ndim > 1 else audio, color='blue')
+            plt.title("Recorded Audio Waveform")
+            plt.xlabel("Time (s)")
+            plt.ylabel("Amplitude")
+            plt.grid(True)
+            plt.show(block=False)
+            plt.pause(2)
+            plt.close()
+        except Exception as e:
+            print(f"Error visualizing waveform: {e}")
     
-    # Visualize waveform
+    return audio
+
+async def stream_transcribe(max_duration=DURATION, preroll=()):
+    """Stream microphone audio to Deepgram live STT and return the transcript once speech ends.
+
+    `preroll` is PCM16 frames already captured (e.g. the speech that interrupted the bot);
+    they are sent ahead of the live audio. Returns None if the live connection could not be opened.
+    """
+    loop = asyncio.get_running_loop()
+    speech_done = asyncio.Event()
+    final_parts = []
+
+    dg_connection = deepgram.listen.asyncwebsocket.v("1")
+
+    async def on_transcript(self, result, **kwargs):
+        transcript = result.channel.alternatives[0].transcript
+        if result.is_final and transcript:
+            final_parts.append(transcript)
+        # Finalize early on Deepgram's endpointing instead of waiting for UtteranceEnd
+        if result.speech_final and final_parts:
+            speech_done.set()
+
+    async def on_utterance_end(self, utterance_end, **kwargs):
+        if final_parts:
+            speech_done.set()
+
+    dg_connection.on(LiveTranscriptionEvents.Transcript, on_transcript)
+    dg_connection.on(LiveTranscriptionEvents.UtteranceEnd, on_utterance_end)
+
+    options = LiveOptions(
+        model="nova-2",
+        language="en-IN",
+        encoding="linear16",
+        sample_rate=SAMPLE_RATE,
+        channels=CHANNELS,
+        smart_format=True,
+        interim_results=True,
+        utterance_end_ms="1000",
+        endpointing=300,
+        vad_events=True
+    )
+    pending = list(preroll)  # audio captured before the websocket is open
+    send_lock = threading.Lock()
+    connected = False
+
+    def callback(indata, frames, time_info, status):
+        if status:
+            print(f"Audio input status: {status}")
+        with send_lock:
+            if connected:
+                asyncio.run_coroutine_threadsafe(dg_connection.send(bytes(indata)), loop)
+            else:
+                pending.append(bytes(indata))
+
     try:
-        plt.figure(figsize=(10, 4))
-        time_axis = np.linspace(0, duration, len(audio_data))
-        plt.plot(time_axis, audio_data[:, 0] if audio_data.ndim > 1 else audio_data, color='blue')
-        plt.title("Recorded Audio Waveform")
-        plt.xlabel("Time (s)")
-        plt.ylabel("Amplitude")
-        plt.grid(True)
-        plt.show(block=False)
-        plt.pause(2)
-        plt.close()
+        # Open the mic before connecting so speech during the handshake isn't lost
+        with sd.RawInputStream(samplerate=SAMPLE_RATE, blocksize=FRAME_SIZE, dtype='int16',
+                               channels=CHANNELS, callback=callback):
+            try:
+                if not await dg_connection.start(options):
+                    print("Error: Could not open Deepgram live connection.")
+                    return None
+            except Exception as e:
+                print(f"Deepgram live connection error: {e}")
+                return None
+
+            with send_lock:
+                for frame in pending:
+                    asyncio.run_coroutine_threadsafe(dg_connection.send(frame), loop)
+                connected = True
+
+            print("🎤 Listening... (stops automatically when you finish speaking)")
+            try:
+                await asyncio.wait_for(speech_done.wait(), timeout=max_duration)
+            except asyncio.TimeoutError:
+                print(f"No end of speech detected within {max_duration} seconds.")
+            finally:
+                await dg_connection.finish()
     except Exception as e:
-        print(f"Error visualizing waveform: {e}")
-    
-    return tmp_file.name
+        print(f"Error streaming audio: {e}")
+
+    return " ".join(final_parts).strip()
+
+@functools.lru_cache(maxsize=1)
+def get_pcm_scratch():
+    return np.empty((DURATION * SAMPLE_RATE, CHANNELS), dtype=np.float32)
 
-def transcribe_audio(audio_file):
-    """Transcribe audio using Deepgram Speech-to-Text with retry mechanism."""
-    if not os.path.exists(audio_file):
-        print(f"Error: Audio file {audio_file} does not exist.")
-        return ""
+def to_pcm16(audio):
+    """Quantize float32 samples in [-1, 1] to little-endian 16-bit PCM bytes."""
+    pcm_scratch = get_pcm_scratch()
+    scratch = pcm_scratch[:len(audio)] if len(audio) <= len(pcm_scratch) else np.empty_like(audio)
+    np.multiply(audio, 32767, out=scratch)
+    np.clip(scratch, -32768, 32767, out=scratch)
+    return scratch.astype('<i2').tobytes()
+
+async def transcribe_audio(audio):
+    """Transcribe recorded audio using Deepgram Speech-to-Text with retry mechanism."""
+    # Send raw linear16 so Deepgram doesn't have to parse a WAV container
+    pcm_bytes = to_pcm16(audio)
 
     max_retries = 3
     retry_delay = 5
     for attempt in range(max_retries):
         try:
-            print(f"Attempting to transcribe {audio_file}, size: {os.path.getsize(audio_file)} bytes")
-            with open(audio_file, "rb") as audio:
-                source = {"buffer": audio}
-                options = PrerecordedOptions(
-                    model="nova-2",
-                    language="en-IN",
-                    smart_format=True
-                )
-                response = deepgram.listen.rest.v("1").transcribe_file(source, options)
-                print("DEBUG Deepgram STT full response:", response)
-                transcript = response["results"]["channels"][0]["alternatives"][0]["transcript"]
-                if not transcript:
-                    print("WARNING: Empty transcript from Deepgram Speech-to-Text.")
-                return transcript.strip()
+            print(f"Attempting to transcribe {len(pcm_bytes)} bytes of PCM audio")
+            source = {"buffer": pcm_bytes, "mimetype": f"audio/l16;rate={SAMPLE_RATE}"}
+            options = PrerecordedOptions(
+                model="nova-2",
+                encoding="linear16",
+                sample_rate=SAMPLE_RATE,
+                channels=CHANNELS,
+                language="en-IN",
+                smart_format=True,
+                punctuate=True,
+                diarize=False
+            )
+            response = await deepgram.listen.asyncrest.v("1").transcribe_file(source, options)
+            print("DEBUG Deepgram STT full response:", response)
+            transcript = response["results"]["channels"][0]["alternatives"][0]["transcript"]
+            if not transcript:
+                print("WARNING: Empty transcript from Deepgram Speech-to-Text.")
+            return transcript.strip()
         except Exception as e:
             print(f"Deepgram Speech-to-Text error (attempt {attempt + 1}/{max_retries}): {e}")
             if attempt < max_retries - 1:
                 print(f"Retrying in {retry_delay} seconds...")
-                time.sleep(retry_delay)
+                await asyncio.sleep(retry_delay)
             else:
                 print("Max retries reached. Transcription failed.")
                 return ""
 
-def generate_text(prompt):
-    """Generate text response from Gemini."""
-    # Handle greetings
-    if prompt.lower().strip() in ["hello", "hello?", "hi", "hi.", "hiiiii"]:
-        return "Hi! I'm your Kerala Agri Chatbot. Ask me about farming, weather, or anything else!"
-    
+def build_prompt(prompt):
+    """Add date context to a user prompt."""
     # Include current date for date-related queries
     if "today" in prompt.lower():
         current_date = datetime.now().strftime("%A, %B %d, %Y")
         prompt = f"{prompt} (Current date is {current_date})"
-    
-    # Add instruction to keep responses concise
-    prompt = f"{prompt} Please keep the response concise and under 2000 characters."
-    
-    response = client.models.generate_content(
-        model="gemini-2.5-flash",
-        contents=prompt
+    return prompt
+
+def is_greeting(prompt):
+    """Return True for greetings that get the canned reply instead of a Gemini call."""
+    return prompt.lower().strip() in ["hello", "hello?", "hi", "hi.", "hiiiii"]
+
+async def stream_sentences(prompt):
+    """Stream a Gemini response and yield it sentence by sentence."""
+    # Handle greetings
+    if is_greeting(prompt):
+        yield "Hi! I'm your Kerala Agri Chatbot. Ask me about farming, weather, or anything else!"
+        return
+
+    buffer = ""
+    stream = await client.aio.models.generate_content_stream(
+        model=GEMINI_MODEL,
+        contents=build_prompt(prompt),
+        config=types.GenerateContentConfig(system_instruction=SYSTEM_PROMPT)
     )
-    return response.text
+    async for chunk in stream:
+        buffer += chunk.text or ""
+        # Everything before the last sentence boundary is complete
+        *sentences, buffer = SENTENCE_BOUNDARY.split(buffer)
+        for sentence in sentences:
+            if sentence.strip():
+                yield sentence.strip()
+    if buffer.strip():
+        yield buffer.strip()
 
-async def async_generate_speech(text, filename):
-    """Async helper to generate speech using Deepgram TTS."""
+async def async_generate_speech(text, chunks):
+    """Async helper to stream Deepgram TTS as raw PCM into the `chunks` queue.
+
+    Puts None on the queue when done and returns the full PCM bytes.
+    """
+    audio = bytearray()
     try:
         options = SpeakOptions(
             model="aura-asteria-en",
-            encoding="mp3"
+            encoding=TTS_ENCODING,
+            sample_rate=TTS_SAMPLE_RATE,
+            container="none"
         )
         payload = {"text": text}
-        response = await deepgram.speak.asyncrest.v("1").save(filename, payload, options)
-        print(f"TTS Response: {response.to_json(indent=4)}")
+        response = await deepgram.speak.asyncrest.v("1").stream_raw(payload, options)
+        try:
+            response.raise_for_status()
+            async for chunk in response.aiter_bytes():
+                audio.extend(chunk)
+                chunks.put_nowait(chunk)
+        finally:
+            await response.aclose()
+        return bytes(audio)
     except Exception as e:
         print(f"Deepgram TTS async error: {e}")
         raise
+    finally:
+        chunks.put_nowait(None)
 
-def generate_speech(text, lang='en'):
-    """Generate speech using Deepgram Text-to-Speech and play it."""
-    if lang != 'en':
-        print("Warning: Only English TTS supported.")
-    
-    MAX_CHAR_LIMIT = 2000  # Deepgram's character limit
-    
-    # Truncate or split text if it exceeds the limit
-    if len(text) > MAX_CHAR_LIMIT:
-        print(f"Warning: Text exceeds {MAX_CHAR_LIMIT} characters ({len(text)}). Truncating to fit.")
-        text = text[:MAX_CHAR_LIMIT]  # Simple truncation
-        # Alternatively, for splitting into chunks (uncomment if preferred):
-        # chunks = [text[i:i+MAX_CHAR_LIMIT] for i in range(0, len(text), MAX_CHAR_LIMIT)]
-        # for i, chunk in enumerate(chunks):
-        #     filename = tempfile.mktemp(suffix=f"_{i}.mp3")
-        #     try:
-        #         asyncio.run(async_generate_speech(chunk, filename))
-        #         if os.path.exists(filename):
-        #             play_audio(os.path.normpath(filename))
-        #         else:
-        #             print(f"Error: Audio file {filename} was not generated.")
-        #     except Exception as e:
-        #         print(f"Deepgram Text-to-Speech error for chunk {i}: {e}")
-        #     finally:
-        #         if os.path.exists(filename):
-        #             try:
-        #                 os.unlink(filename)
-        #             except Exception as e:
-        #                 print(f"Failed to delete temporary file {filename}: {e}")
-        # return  # Exit after processing chunks
-
-    filename = tempfile.mktemp(suffix=".mp3")
+def split_for_tts(text):
+    """Split text longer than Deepgram's limit at word boundaries instead of truncating it."""
+    pieces = []
+    while len(text) > TTS_CHAR_LIMIT:
+        cut = text.rfind(" ", 0, TTS_CHAR_LIMIT)
+        if cut <= 0:
+            cut = TTS_CHAR_LIMIT
+        pieces.append(text[:cut])
+        text = text[cut:].lstrip()
+    pieces.append(text)
+    return pieces
+
+async def speak_response(prompt):
+    """Pipeline Gemini output into Deepgram TTS and playback one sentence at a time.
+
+    Returns the full response text and the concatenated PCM audio (None if any clip failed).
+    """
+    clips = asyncio.Queue()
+    tts_slots = asyncio.Semaphore(TTS_CONCURRENCY)
+    sentences = []
+    audio_parts = []
+    tts_failed = False
+
+    async def playback():
+        nonlocal tts_failed
+        loop = asyncio.get_running_loop()
+        pcm = queue.Queue()  # PCM chunks for the audio callback; None marks the end
+        finished = asyncio.Event()
+        current = memoryview(b"")
+
+        def callback(outdata, frames, time_info, status):
+            # Copy queued bytes straight into the device buffer; chunks may split a sample
+            nonlocal current
+            filled = 0
+            while filled < len(outdata):
+                if not current:
+                    try:
+                        chunk = pcm.get_nowait()
+                    except queue.Empty:
+                        break
+                    if chunk is None:
+                        outdata[filled:] = bytes(len(outdata) - filled)
+                        loop.call_soon_threadsafe(finished.set)
+                        raise sd.CallbackStop
+                    current = memoryview(chunk)
+                n = min(len(outdata) - filled, len(current))
+                outdata[filled:filled + n] = current[:n]
+                current = current[n:]
+                filled += n
+            outdata[filled:] = bytes(len(outdata) - filled)  # Underrun: pad with silence
+
+        with sd.RawOutputStream(samplerate=TTS_SAMPLE_RATE, channels=1, dtype='int16',
+                                callback=callback) as out:
+            try:
+                while (item := await clips.get()) is not None:
+                    tts_task, chunks = item
+                    # Play PCM as it arrives
+                    while (chunk := await chunks.get()) is not None:
+                        pcm.put(chunk)
+                    try:
+                        audio_parts.append(await tts_task)
+                    except Exception as e:
+                        tts_failed = True
+                        print(f"Deepgram Text-to-Speech error: {e}")
+                pcm.put(None)
+                await finished.wait()
+            except asyncio.CancelledError:
+                # Drop queued audio; in callback mode abort() can't race a blocking write
+                while True:
+                    try:
+                        pcm.get_nowait()
+                    except queue.Empty:
+                        break
+                out.abort()
+                raise
+
+    async def synthesize(text, chunks):
+        async with tts_slots:
+            return await async_generate_speech(text, chunks)
+
+    async def stop_speaking():
+        # Cancel playback and synthesis, and wait so the output stream is closed on return
+        player.cancel()
+        for task in tts_tasks:
+            task.cancel()
+        await asyncio.gather(player, *tts_tasks, return_exceptions=True)
+
+    player = asyncio.create_task(playback())
+    tts_tasks = []
+    print("🤖 Bot:", end=" ", flush=True)
     try:
-        asyncio.run(async_generate_speech(text, filename))
-        if os.path.exists(filename):
-            play_audio(os.path.normpath(filename))
-        else:
-            print("Error: Audio file was not generated.")
+        try:
+            async for sentence in stream_sentences(prompt):
+                print(sentence, end=" ", flush=True)
+                sentences.append(sentence)
+                # Synthesize upcoming sentences while earlier ones are still playing
+                for piece in split_for_tts(sentence):
+                    chunks = asyncio.Queue()
+                    tts_task = asyncio.create_task(synthesize(piece, chunks))
+                    tts_tasks.append(tts_task)
+                    clips.put_nowait((tts_task, chunks))
+        finally:
+            print()
+            clips.put_nowait(None)
+        await player
+    except BaseException:
+        # Barge-in or a Gemini/TTS error: nothing may keep playing into the next turn
+        await stop_speaking()
+        raise
+    return " ".join(sentences), None if tts_failed else b"".join(audio_parts)
+
+def init_cache():
+    """Create the response cache table, drop expired answers and load recent embeddings into memory."""
+    global cache_conn, cache_hashes, cache_embeddings, cache_times
+    cache_conn = sqlite3.connect(CACHE_DB, check_same_thread=False)
+    # WAL with synchronous=NORMAL skips the per-commit fsync of the default rollback journal
+    cache_conn.execute("PRAGMA journal_mode=WAL")
+    cache_conn.execute("PRAGMA synchronous=NORMAL")
+    cache_conn.execute("""
+        CREATE TABLE IF NOT EXISTS response_cache (
+            prompt_hash TEXT PRIMARY KEY,
+            embedding BLOB,
+            response TEXT,
+            tts_audio BLOB,
+            timestamp DATETIME,
+            tts_encoding TEXT
+        )
+    """)
+    # Tables created before audio moved from MP3 to PCM lack the encoding column;
+    # their rows stay NULL and are never played back
+    columns = [row[1] for row in cache_conn.execute("PRAGMA table_info(response_cache)")]
+    if "tts_encoding" not in columns:
+        cache_conn.execute("ALTER TABLE response_cache ADD COLUMN tts_encoding TEXT")
+    # Answers about weather, prices or "this week" go stale, so nothing is served past CACHE_TTL
+    cache_conn.execute("DELETE FROM response_cache WHERE timestamp < ?", (cache_cutoff(),))
+    cache_conn.commit()
+    rows = cache_conn.execute(
+        "SELECT prompt_hash, embedding, timestamp FROM response_cache WHERE tts_encoding = ? "
+        "ORDER BY timestamp DESC LIMIT ?",
+        (TTS_ENCODING, CACHE_MAX_ROWS)
+    ).fetchall()
+    rows.reverse()  # oldest first, so appends and [-CACHE_MAX_ROWS:] evict the oldest entries
+    cache_hashes = [row[0] for row in rows]
+    if rows:
+        cache_embeddings = np.stack([np.frombuffer(row[1], dtype=np.float32) for row in rows])
+        cache_times = np.array([datetime.fromisoformat(row[2]).timestamp() for row in rows])
+
+def cache_cutoff():
+    """Return the ISO timestamp before which cached answers have expired."""
+    return datetime.fromtimestamp(time.time() - CACHE_TTL).isoformat()
+
+def drop_expired_cache_entries():
+    """Remove entries older than CACHE_TTL from the in-memory index."""
+    global cache_hashes, cache_embeddings, cache_times
+    # Entries are kept oldest first, so the expired ones are a prefix
+    expired = int(np.searchsorted(cache_times, time.time() - CACHE_TTL))
+    if expired:
+        cache_hashes = cache_hashes[expired:]
+        cache_embeddings = cache_embeddings[expired:]
+        cache_times = cache_times[expired:]
+
+async def embed_prompt(prompt):
+    """Return a unit-length embedding for a prompt, or None if embedding fails."""
+    try:
+        result = await client.aio.models.embed_content(
+            model=EMBEDDING_MODEL,
+            contents=prompt,
+            config=types.EmbedContentConfig(output_dimensionality=EMBEDDING_DIM)
+        )
+        vector = np.asarray(result.embeddings[0].values, dtype=np.float32)
+        return vector / np.linalg.norm(vector)
     except Exception as e:
-        print(f"Deepgram Text-to-Speech error: {e}")
+        print(f"Embedding error: {e}")
+        return None
+
+def lookup_cached_response(embedding):
+    """Return (response, tts_audio) for the most similar cached prompt, or None below the threshold."""
+    drop_expired_cache_entries()
+    if embedding is None or not cache_hashes:
+        return None
+    similarities = cache_embeddings @ embedding  # rows are unit-length, so this is cosine
+    best = int(np.argmax(similarities))
+    if similarities[best] < CACHE_SIMILARITY:
+        return None
+    return cache_conn.execute(
+        "SELECT response, tts_audio FROM response_cache "
+        "WHERE prompt_hash = ? AND tts_encoding = ? AND timestamp >= ?",
+        (cache_hashes[best], TTS_ENCODING, cache_cutoff())
+    ).fetchone()
+
+def store_cached_response(prompt, embedding, response, tts_audio):
+    """Persist a response and its synthesized audio, and add it to the in-memory index."""
+    global cache_hashes, cache_embeddings, cache_times
+    prompt_hash = hashlib.sha256(prompt.lower().strip().encode("utf-8")).hexdigest()
+    now = datetime.now()
+    cache_conn.execute(
+        "INSERT OR REPLACE INTO response_cache "
+        "(prompt_hash, embedding, response, tts_audio, timestamp, tts_encoding) VALUES (?, ?, ?, ?, ?, ?)",
+        (prompt_hash, embedding.tobytes(), response, tts_audio, now.isoformat(), TTS_ENCODING)
+    )
+    cache_conn.commit()
+    # A replaced entry moves to the end so the index stays ordered by store time
+    keep = [i for i, h in enumerate(cache_hashes) if h != prompt_hash]
+    cache_hashes = ([cache_hashes[i] for i in keep] + [prompt_hash])[-CACHE_MAX_ROWS:]
+    cache_embeddings = np.vstack([cache_embeddings[keep], embedding])[-CACHE_MAX_ROWS:]
+    cache_times = np.append(cache_times[keep], now.timestamp())[-CACHE_MAX_ROWS:]
+
+async def cached_respond(prompt):
+    """Answer from the semantic cache when a similar question was asked before, else generate and cache.
+
+    Returns the response text.
+    """
+    # Date-dependent answers must not be served from the cache, and greetings never reach
+    # Gemini, so neither is worth an embedding request
+    cacheable = "today" not in prompt.lower() and not is_greeting(prompt)
+    embedding = await embed_prompt(prompt) if cacheable else None
+
+    cached = lookup_cached_response(embedding)
+    if cached is not None:
+        response, tts_audio = cached
+        print("🤖 Bot (cached):", response)
+        await play_audio(tts_audio)
+        return response
+
+    response, tts_audio = await speak_response(prompt)
+    if embedding is not None and tts_audio:
+        store_cached_response(prompt, embedding, response, tts_audio)
+    return response
+
+async def interruptible(coro):
+    """Run coro, cancelling it once the microphone picks up the user speaking.
+
+    Speech must stay above BARGE_IN_RMS for BARGE_IN_BLOCKS consecutive frames, so a click
+    or a cough doesn't cut it off. The bot's own voice is not filtered out, which is why this
+    is only used when BARGE_IN is enabled for headphones. Returns (result, speech_frames):
+    result is None when interrupted, and speech_frames holds the PCM16 frames of the
+    interrupting speech (None when not interrupted) for stream_transcribe to send first.
+    """
+    loop = asyncio.get_running_loop()
+    speech = asyncio.Event()
+    recent = collections.deque(maxlen=BARGE_IN_BLOCKS)  # frames leading up to the trigger
+    speech_frames = []
+    loud_blocks = 0
+    triggered = False
+
+    def callback(indata, frames, time_info, status):
+        nonlocal loud_blocks, triggered
+        frame = indata.tobytes()
+        if triggered:
+            speech_frames.append(frame)  # Keep capturing until the stream closes
+            return
+        recent.append(frame)
+        level = float(np.sqrt(np.mean(np.square(indata, dtype=np.float32)))) / 32768
+        loud_blocks = loud_blocks + 1 if level > BARGE_IN_RMS else 0
+        if loud_blocks >= BARGE_IN_BLOCKS:
+            triggered = True
+            speech_frames.extend(recent)
+            loop.call_soon_threadsafe(speech.set)
+
+    task = asyncio.ensure_future(coro)
+    speech_task = asyncio.ensure_future(speech.wait())
+    try:
+        with sd.InputStream(samplerate=SAMPLE_RATE, channels=CHANNELS, dtype='int16',
+                            blocksize=FRAME_SIZE, callback=callback):
+            await asyncio.wait({task, speech_task}, return_when=asyncio.FIRST_COMPLETED)
     finally:
-        if os.path.exists(filename):
-            try:
-                os.unlink(filename)
-            except Exception as e:
-                print(f"Failed to delete temporary file {filename}: {e}")
+        speech_task.cancel()
+        if not task.done():
+            # Interrupted, or the mic failed to open: the response must not keep speaking
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+    if task.cancelled():
+        return None, speech_frames
+    return task.result(), None
+
+async def warm_up_connections():
+    """Open the pooled Gemini TLS connection with a free model-metadata request before the first turn."""
+    try:
+        await client.aio.models.get(model=GEMINI_MODEL)
+    except Exception as e:
+        print(f"Connection warm-up failed: {e}")
+
+def run_async(coro):
+    """Run a coroutine on the session's background event loop and wait for its result."""
+    return asyncio.run_coroutine_threadsafe(coro, loop).result()
 
 # ---------------------------
 # Main Chatbot Loop
 # ---------------------------
 def chatbot():
     print("🤖 Welcome to Kerala Agri Chatbot!")
+    init_cache()
+    # Warm the shared Gemini connection in the background
+    asyncio.run_coroutine_threadsafe(warm_up_connections(), loop)
     print("Note: Voice mode currently supports English only due to Deepgram limitations.")
+    if BARGE_IN:
+        print("In voice mode, start speaking while the bot talks to interrupt it.")
+    preroll = None
     while True:
-        mode = input("Choose input mode: [1] Voice, [2] Text, [q] Quit: ").strip().lower()
+        if preroll is not None:
+            # The user interrupted the bot: go straight back to listening
+            mode = '1'
+        else:
+            mode = input("Choose input mode: [1] Voice, [2] Text, [q] Quit: ").strip().lower()
         if mode == 'q':
             print("Goodbye!")
             break
         elif mode == '1':
-            audio_file = record_audio()
-            if audio_file is None:
-                print("Failed to record audio. Try again.")
-                continue
-            user_input = transcribe_audio(audio_file)
+            user_input = run_async(stream_transcribe(preroll=preroll or ()))
+            preroll = None
+            if user_input is None:
+                # Fall back to fixed-length recording + prerecorded STT
+                print("Live transcription unavailable. Falling back to fixed-length recording.")
+                audio = record_audio()
+                user_input = run_async(transcribe_audio(audio))
             print(f"🗣 You said: {user_input}")
-            try:
-                os.unlink(audio_file)
-            except Exception as e:
-                print(f"Failed to delete temporary file {audio_file}: {e}")
         elif mode == '2':
             user_input = input("You: ").strip()
         else:
@@ -248,12 +700,14 @@ def chatbot():
 
         print("🔎 Asking Gemini...")
         try:
-            bot_response = generate_text(user_input)
-            print("🤖 Bot:", bot_response)
+            if mode == '1' and BARGE_IN:
+                bot_response, preroll = run_async(interruptible(cached_respond(user_input)))
+            else:
+                bot_response = run_async(cached_respond(user_input))
+            if preroll is not None:
+                print("⏹ Interrupted.")
+                continue
             print(f"Response length: {len(bot_response)} characters")
-            lang = 'en'
-            print("🔊 Speaking...")
-            generate_speech(bot_response, lang=lang)
         except Exception as e:
             print(f"Error: {e}")
 